@@ -1,11 +1,88 @@
 import streamlit as st
-import plotly.graph_objects as go
+import hashlib
 import json
-import requests  # 使用requests库用于调用DeepSeek API
+import re
+import time
+# plotly 和 requests 改为函数内延迟导入：首屏只渲染表单，用不到它们，
+# 推迟导入可明显缩短冷启动时间（重复导入走sys.modules缓存，几乎零开销）
+
+# orjson（Rust实现）解析JSON比标准库快数倍；未安装时自动回退到标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def import_plotly():
+    """
+    延迟导入 plotly.graph_objects。
+    同时让plotly的图表序列化走orjson（发送到前端前figure会被序列化为JSON）；
+    不支持该配置项的plotly版本直接忽略。
+    """
+    import plotly.graph_objects as go
+    if orjson is not None:
+        try:
+            import plotly.io as pio
+            pio.json.config.default_engine = "orjson"
+        except (AttributeError, ValueError):
+            pass
+    return go
+
+
+def json_loads(data):
+    """解析JSON字符串/字节串，优先使用orjson，未安装时回退到标准库json。"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 # from io import BytesIO # 图片下载功能已移除，不再需要
 # import qrcode # 二维码直接加载图片文件，不再需要动态生成
 # from PIL import Image # Pillow（PIL）用于qrcode，现在也无需导入
 
+# 系统提示词：定义AI的角色和输出格式。
+# 提升为模块级常量，保证每次请求的字节完全一致，
+# 从而命中 DeepSeek 服务端的上下文缓存（对相同前缀自动缓存），降低延迟和费用。
+SYSTEM_PROMPT = """你是一位资深的技术招聘官和职业发展顾问，具有丰富的人才评估经验。
+请基于用户提供的信息，从四个维度进行专业分析：创新指数、协作潜力、领导特质、技术敏感度。
+
+评分标准：
+- 创新指数(innovation)：原创思维、问题解决能力、创意实现
+- 协作潜力(collaboration)：团队合作、沟通能力、集体意识
+- 领导特质(leadership)：决策能力、责任担当、影响力
+- 技术敏感度(tech_acumen)：技术理解、学习能力、前瞻性
+
+请严格按照以下JSON格式输出，不要添加任何其他内容：
+{
+  "scores": {
+    "innovation": <1-100之间的整数>,
+    "collaboration": <1-100之间的整数>,
+    "leadership": <1-100之间的整数>,
+    "tech_acumen": <1-100之间的整数>
+  },
+  "analysis": "<约100-150字的综合分析，语言积极鼓励，突出闪光点>",
+  "golden_sentence": "<一句精炼的专属评语，作为用户的AI Slogan>"
+}
+"""
+
+# 用户提示词模板：静态文案在导入时构建一次，
+# 每次请求只需用 format_map 填入昵称和四个维度的回答
+USER_PROMPT_TEMPLATE = """请分析以下用户信息：
+
+用户昵称：{user_name}
+
+创新指数相关信息：
+{innovation}
+
+协作潜力相关信息：
+{collaboration}
+
+领导特质相关信息：
+{leadership}
+
+技术敏感度相关信息：
+{tech_acumen}
+
+请基于以上信息进行专业分析并按JSON格式输出。"""
+
 # 页面配置
 st.set_page_config(
     page_title="WAIC AI潜力画像生成器 (DeepSeek版)",  # 标题更新以反映模型变化
@@ -13,8 +90,10 @@ st.set_page_config(
     layout="wide"
 )
 
-# 自定义CSS样式，用于美化页面元素
-st.markdown("""
+# 自定义CSS样式，用于美化页面元素。
+# 与系统提示词一样提升为模块级常量，字符串只在导入时构建一次，
+# 每次rerun时直接复用。
+CUSTOM_CSS = """
 <style>
     .main-title {
         text-align: center;
@@ -51,29 +130,252 @@ st.markdown("""
         min-height: 400px;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# 导入时对CSS做一次轻量压缩（折叠空白符），减少每次rerun发送到前端的字节数；
+# 用 st.html 直接注入，跳过 markdown 解析和 unsafe_allow_html 开关
+CUSTOM_CSS_MIN = re.sub(r'\s+', ' ', CUSTOM_CSS).strip()
+
+st.html(CUSTOM_CSS_MIN)
+
+# DeepSeek API端点和请求体骨架。除对话消息外的参数全部固定，
+# 导入时构建一次，每次调用浅拷贝后只填入messages。
+DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
+PAYLOAD_SKELETON = {
+    "model": "deepseek-chat", # DeepSeek模型名称
+    "max_tokens": 1000,
+    "temperature": 0.7,
+    "response_format": {"type": "json_object"}, # 明确要求返回JSON格式
+    "stream": True # 流式返回，边生成边接收，缩短感知等待时间
+}
+
+# 请求超时：连接5秒快速失败（服务不可达时不让用户干等），读取55秒覆盖生成耗时
+REQUEST_TIMEOUT = (5, 55)
+
+# 熔断配置：连续失败达到阈值后，在冷却期内直接提示服务不可用，
+# 避免现场排队的用户每人都撞一次完整的超时
+BREAKER_THRESHOLD = 3   # 连续失败次数阈值
+BREAKER_COOLDOWN = 60   # 熔断冷却时间（秒）
+
+# Plotly前端配置：开启工具栏的"下载为图片"按钮，由浏览器直接光栅化导出PNG，
+# 服务器端无需安装kaleido或浏览器内核，导出开销完全在客户端
+PLOTLY_CONFIG = {
+    'displaylogo': False,
+    'toImageButtonOptions': {
+        'format': 'png',
+        'filename': 'waic_ai_potential_portrait',
+        'scale': 2  # 2倍分辨率，导出图片更清晰，适合分享
+    }
+}
+
+# 兜底解析器：raw_decode 从指定位置线性扫描出第一个完整的JSON对象，
+# 自动忽略其后的多余文本，无需正则回溯
+JSON_DECODER = json.JSONDecoder()
+
+# 分析结果必须包含的字段
+REQUIRED_RESULT_KEYS = ('scores', 'analysis', 'golden_sentence')
 
+
+def coerce_score(value):
+    """把单个分数安全地转换为整数，转换失败返回0。"""
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return 0
+
+
+def validate_analysis_result(result):
+    """校验API返回的分析结果：必须是包含全部必要字段的字典，且scores是字典。"""
+    if not isinstance(result, dict):
+        return False
+    if any(key not in result for key in REQUIRED_RESULT_KEYS):
+        return False
+    return isinstance(result['scores'], dict)
+
+# 表单四个维度的字段顺序，作为统一表单状态字典的键
+FORM_DIMENSIONS = ('innovation', 'collaboration', 'leadership', 'tech_acumen')
+
+# 静态推广/占位HTML片段。导入时构建一次，侧边栏和结果页复用，
+# 相同内容不再维护两份内联字符串。
+PROMO_LEARN_HTML = """
+<div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            padding: 20px; border-radius: 10px; color: white; text-align: center;'>
+    <h4>🎓 想深入学习AI？</h4>
+    <p>获取更多WAIC独家资源<br>
+    职业发展机会等你来！</p>
+</div>
+"""
+
+SIDEBAR_PROMO_HTML = """
+<div style='text-align: center; padding: 10px; background-color: #f0f8ff; border-radius: 8px;'>
+    <p style='font-size: 14px; margin-bottom: 10px;'>
+    如果你想深入了解 AI 培训、<br>
+    职业发展机会或参与我们的<br>
+    社群，欢迎扫描下方二维码<br>
+    或添加我的微信，获取更多<br>
+    WAIC 独家资源！
+    </p>
+</div>
+"""
+
+# qr_code.png 缺失时的占位提示（结果页和侧边栏共用）
+QR_PLACEHOLDER_HTML = """
+<div style='text-align: center; padding: 20px; border: 2px dashed #667eea; border-radius: 8px;'>
+    <p>📱 微信二维码</p>
+    <small>请将二维码图片保存为 qr_code.png</small>
+</div>
+"""
+
+# 二维码下方的联系方式说明（结果页和侧边栏共用）
+WECHAT_CONTACT_FOOTER_HTML = """
+<div style='text-align: center; font-size: 12px; color: #666; margin-top: 10px;'>
+    扫描你名片上的微信二维码，<br>
+    或联系我获取更多信息！
+</div>
+"""
+
+# 表单四个问题的定义：维度key -> (问题文案, 占位提示)，表单内循环生成text_area
+FORM_QUESTIONS = {
+    'innovation': (
+        "🧠 **创新指数**：请描述一个你近期主导或参与的最有创意的项目或想法，你是如何贡献原创思路的？",
+        "请详细描述你的创新经历..."
+    ),
+    'collaboration': (
+        "🤝 **协作潜力**：请描述一次重要的团队合作经历。你的角色是什么？你如何促进沟通和团队效率？",
+        "请分享你的团队协作经验..."
+    ),
+    'leadership': (
+        "👑 **领导特质**：想象你领导的项目严重落后，你会采取哪三个关键步骤来扭转局面？",
+        "请描述你的领导策略..."
+    ),
+    'tech_acumen': (
+        "⚡ **技术敏感度**：哪一项新兴 AI 技术（如：多模态、AI Agent、生成式视频）最让你感到兴奋？为什么？你认为它会如何改变你所在的行业？",
+        "请分享你对AI技术的见解..."
+    ),
+}
+
+# 四个维度得分的展示标签，顺序与 FORM_DIMENSIONS 一致
+SCORE_LABELS = (
+    ("🧠 创新指数", 'innovation'),
+    ("🤝 协作潜力", 'collaboration'),
+    ("👑 领导特质", 'leadership'),
+    ("⚡ 技术敏感度", 'tech_acumen'),
+)
+
+# 雷达图的静态骨架：四个维度标签和与用户无关的布局配置。
+# 预先在模块级构建一次，create_radar_chart 每次调用只需填入分数和标题，
+# 避免在每次rerun时重复构造这些字典。
+RADAR_CATEGORIES = ('创新指数', '协作潜力', '领导特质', '技术敏感度')
+RADAR_LAYOUT_SKELETON = dict(
+    polar=dict(
+        radialaxis=dict(
+            visible=True,
+            range=[0, 100],  # 分数范围0-100
+            tickfont=dict(size=12),
+            gridcolor='rgba(0,0,0,0.1)'  # 网格线颜色
+        ),
+        angularaxis=dict(
+            tickfont=dict(size=14, color='#2c3e50'),  # 角度轴字体样式
+            gridcolor='rgba(0,0,0,0.1)'  # 网格线颜色
+        )
+    ),
+    showlegend=True,  # 显示图例
+    font=dict(family="Arial, sans-serif"),  # 整体字体
+    margin=dict(t=80, b=40, l=40, r=40)  # 调整图表边距
+)
+
+
+def analysis_cache_key(user_inputs, user_name):
+    """
+    根据用户昵称和四个维度的回答计算稳定的缓存键。
+    相同输入（例如误触重复提交、返回后再次提交）直接复用上次的分析结果，
+    避免重复调用DeepSeek。
+    """
+    raw = json.dumps([user_name, user_inputs], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@st.cache_resource
+def get_breaker_state():
+    """
+    进程级熔断状态。DeepSeek故障会影响所有会话，
+    因此失败计数跨会话共享，任何一个会话触发熔断后大家都快速失败。
+    """
+    return {"failures": 0, "opened_at": 0.0}
+
+
+@st.cache_resource
+def get_http_session():
+    """
+    返回进程内共享的 requests.Session。
+    相比每次调用都新建连接，Session 可以复用与 DeepSeek 的 TCP/TLS 连接
+    （keep-alive），省去每次请求的握手开销。
+    对连接失败和 429/5xx 配置了带退避的自动重试，瞬时抖动不再直接报错给用户。
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    retry = Retry(
+        total=2, # 最多自动重试2次
+        backoff_factor=0.5, # 重试间隔 0.5s、1s 递增
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"POST"}), # 聊天接口是POST，需显式允许重试
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=8)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # 固定不变的请求头放在Session上，每次调用只需补充Authorization；
+    # 显式声明gzip压缩和keep-alive长连接
+    session.headers.update({
+        "Content-Type": "application/json",
+        "Accept-Encoding": "gzip",
+        "Connection": "keep-alive",
+    })
+    return session
+
+
+@st.cache_data
+def load_qr_code():
+    """
+    读取微信二维码图片（qr_code.png）并缓存字节内容。
+    二维码是静态素材，无需在每次rerun时重复读盘；
+    文件不存在时返回 None，由调用方展示占位提示。
+    """
+    try:
+        with open("qr_code.png", "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+@st.cache_data
 def create_radar_chart(scores, user_name):
     """
     创建用户的AI潜力雷达图。
+    结果按 (scores, user_name) 缓存：同一份分数在rerun时直接复用已构建的图表，
+    不再重新走一遍Figure构建。cache_data返回的是反序列化副本，调用方可安全使用。
     参数:
         scores (dict): 包含 'innovation', 'collaboration', 'leadership', 'tech_acumen' 分数的字典。
         user_name (str): 用户昵称，用于图表标题和图例。
     返回:
         plotly.graph_objects.Figure: 生成的雷达图对象。
     """
-    categories = ['创新指数', '协作潜力', '领导特质', '技术敏感度']
-    values = [
+    go = import_plotly() # 延迟导入，仅在首次绘图时支付导入成本
+
+    values = (
         scores.get('innovation', 0),    # 使用.get()确保即使键不存在也不会报错，并提供默认值
-        scores.get('collaboration', 0), 
+        scores.get('collaboration', 0),
         scores.get('leadership', 0),
         scores.get('tech_acumen', 0)
-    ]
-    
-    # 为了闭合雷达图，将第一个值追加到末尾
-    values_closed = values + [values[0]]
-    categories_closed = categories + [categories[0]]
-    
+    )
+
+    # 为了闭合雷达图，将第一个值追加到末尾（元组字面量一次构建完成）
+    values_closed = (*values, values[0])
+    categories_closed = (*RADAR_CATEGORIES, RADAR_CATEGORIES[0])
+
     fig = go.Figure()
     
     fig.add_trace(go.Scatterpolar(
@@ -86,29 +388,16 @@ def create_radar_chart(scores, user_name):
         name=f'{user_name}的AI潜力画像' # 图例名称
     ))
     
+    # 静态布局来自模块级骨架，这里只补充与用户相关的标题
     fig.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                range=[0, 100], # 分数范围0-100
-                tickfont=dict(size=12),
-                gridcolor='rgba(0,0,0,0.1)' # 网格线颜色
-            ),
-            angularaxis=dict(
-                tickfont=dict(size=14, color='#2c3e50'), # 角度轴字体样式
-                gridcolor='rgba(0,0,0,0.1)' # 网格线颜色
-            )
-        ),
-        showlegend=True, # 显示图例
+        RADAR_LAYOUT_SKELETON,
         title=dict(
             text=f"📊 {user_name} 的 AI 潜力雷达图", # 图表主标题
             x=0.5, # 标题居中
             font=dict(size=20, color='#2c3e50')
-        ),
-        font=dict(family="Arial, sans-serif"), # 整体字体
-        margin=dict(t=80, b=40, l=40, r=40) # 调整图表边距
+        )
     )
-    
+
     return fig
 
 def call_deepseek_api(user_inputs, user_name):
@@ -120,105 +409,107 @@ def call_deepseek_api(user_inputs, user_name):
     返回:
         dict: 包含 'scores', 'analysis', 'golden_sentence' 的字典，如果API调用失败则返回 None。
     """
+    import requests # 延迟导入；except子句中引用requests.exceptions需要此名字
+
+    breaker = get_breaker_state()
     try:
         # 从Streamlit Secrets中获取DeepSeek API密钥
         api_key = st.secrets.get("DEEPSEEK_API_KEY", "")
         if not api_key:
             st.error("❌ API密钥未配置 (DEEPSEEK_API_KEY)，请联系管理员。")
             return None
-            
-        url = "https://api.deepseek.com/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # 构建系统提示词，定义AI的角色和输出格式
-        system_prompt = """你是一位资深的技术招聘官和职业发展顾问，具有丰富的人才评估经验。
-请基于用户提供的信息，从四个维度进行专业分析：创新指数、协作潜力、领导特质、技术敏感度。
 
-评分标准：
-- 创新指数(innovation)：原创思维、问题解决能力、创意实现
-- 协作潜力(collaboration)：团队合作、沟通能力、集体意识  
-- 领导特质(leadership)：决策能力、责任担当、影响力
-- 技术敏感度(tech_acumen)：技术理解、学习能力、前瞻性
+        # 熔断检查：服务连续失败时在冷却期内直接返回，不再让每个用户都撞一次超时
+        if breaker["failures"] >= BREAKER_THRESHOLD:
+            if time.monotonic() - breaker["opened_at"] < BREAKER_COOLDOWN:
+                st.error("🚧 AI服务暂时不稳定，请约1分钟后再试。")
+                return None
+            breaker["failures"] = 0 # 冷却期结束，放行一次试探请求
 
-请严格按照以下JSON格式输出，不要添加任何其他内容：
-{
-  "scores": {
-    "innovation": <1-100之间的整数>,
-    "collaboration": <1-100之间的整数>,
-    "leadership": <1-100之间的整数>,  
-    "tech_acumen": <1-100之间的整数>
-  },
-  "analysis": "<约100-150字的综合分析，语言积极鼓励，突出闪光点>",
-  "golden_sentence": "<一句精炼的专属评语，作为用户的AI Slogan>"
-}
-"""
-        
-        # 用户提示词，包含用户的具体输入和昵称
-        user_prompt = f"""请分析以下用户信息：
 
-用户昵称：{user_name}
+        # 静态请求头已配置在Session上，这里只需携带鉴权信息
+        headers = {"Authorization": f"Bearer {api_key}"}
 
-创新指数相关信息：
-{user_inputs['innovation']}
 
-协作潜力相关信息：
-{user_inputs['collaboration']}
+        # 用户提示词：向模块级模板填入用户的具体输入和昵称
+        user_prompt = USER_PROMPT_TEMPLATE.format_map({**user_inputs, 'user_name': user_name})
 
-领导特质相关信息：
-{user_inputs['leadership']}
 
-技术敏感度相关信息：
-{user_inputs['tech_acumen']}
+        # DeepSeek API 请求的 payload：复用模块级骨架，只填入本次对话消息
+        payload = dict(PAYLOAD_SKELETON)
+        payload["messages"] = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
 
-请基于以上信息进行专业分析并按JSON格式输出。"""
-        
-        # DeepSeek API 请求的 payload
-        payload = {
-            "model": "deepseek-chat", # DeepSeek模型名称
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "max_tokens": 1000,
-            "temperature": 0.7,
-            "response_format": {"type": "json_object"} # 明确要求返回JSON格式
-        }
-
-        # 发送API请求
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
+        # 发送API请求（流式）。完整JSON必须收完才能解析，
+        # 但流式接收能更早发现连接问题，并可向用户展示实时进度。
+        session = get_http_session() # 复用进程级Session，避免每次请求重建TLS连接
+        response = session.post(DEEPSEEK_API_URL, headers=headers, json=payload,
+                                timeout=REQUEST_TIMEOUT, stream=True)
         response.raise_for_status() # 检查HTTP请求是否成功
 
-        result = response.json()
-        # 确保这里 message['content'] 存在且是字符串
-        if 'choices' in result and len(result['choices']) > 0 and \
-           'message' in result['choices'][0] and 'content' in result['choices'][0]['message']:
-            response_text = result['choices'][0]['message']['content']
-        else:
+        progress_slot = st.empty() # 进度提示占位符
+        content_parts = []
+        # 按原始字节处理SSE行，JSON解析器直接吃字节串，省去逐行的unicode解码
+        for raw_line in response.iter_lines():
+            # SSE格式：每条消息形如 "data: {...}"，结束标记为 "data: [DONE]"
+            if not raw_line or not raw_line.startswith(b"data:"):
+                continue
+            data = raw_line[5:].strip()
+            if data == b"[DONE]":
+                break
+            try:
+                chunk = json_loads(data)
+            except ValueError:
+                continue # 跳过无法解析的心跳/异常行
+            choices = chunk.get('choices') or []
+            if choices:
+                piece = (choices[0].get('delta') or {}).get('content')
+                if piece:
+                    content_parts.append(piece)
+                    # 每收到若干片段刷新一次进度，避免过于频繁地更新UI
+                    if len(content_parts) % 20 == 0:
+                        received = sum(len(p) for p in content_parts)
+                        progress_slot.caption(f"✍️ AI 正在生成分析……已接收 {received} 字")
+        progress_slot.empty() # 清除进度提示
+
+        response_text = "".join(content_parts)
+        if not response_text:
             st.error("API返回结构异常，未找到预期内容。")
-            st.info(f"API原始返回（供调试）：{result}")
             return None
-        
+
+        breaker["failures"] = 0 # 成功收到完整响应，清零失败计数
+
+
         # 尝试解析JSON
         try:
-            parsed_result = json.loads(response_text)
-            return parsed_result
-        except json.JSONDecodeError:
-            # 如果直接解析失败，尝试提取JSON部分 (DeepSeek通常会直接返回JSON，但仍保留此健壮性处理)
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
+            parsed_result = json_loads(response_text)
+        except ValueError:  # orjson.JSONDecodeError 和 json.JSONDecodeError 都是 ValueError 的子类
+            # 直接解析失败时，从第一个'{'起用raw_decode线性扫描出完整对象，
+            # 容忍模型偶尔在JSON前后混入的说明文字 (DeepSeek通常会直接返回JSON)
+            start = response_text.find('{')
+            try:
+                if start == -1:
+                    raise ValueError("响应中不含JSON对象")
+                parsed_result, _ = JSON_DECODER.raw_decode(response_text, start)
                 st.warning("API返回内容包含非JSON文本，已尝试提取JSON。")
-                parsed_result = json.loads(json_match.group())
-                return parsed_result
-            else:
+            except ValueError:
                 st.error("API返回格式错误，无法解析JSON。请尝试更具体的输入或联系支持。")
                 st.info(f"API原始返回内容（供调试）：{response_text}") # 显示原始返回以便调试
                 return None
-                
+
+        # 结构校验：缺字段的结果直接判失败，避免下游渲染时才暴露问题
+        if not validate_analysis_result(parsed_result):
+            st.error("API返回的数据缺少必要字段，请重试。")
+            st.info(f"API原始返回内容（供调试）：{response_text}")
+            return None
+        return parsed_result
+
+
     except requests.exceptions.RequestException as e: # 捕获网络请求相关错误
+        breaker["failures"] += 1
+        breaker["opened_at"] = time.monotonic()
         st.error(f"❌ API网络请求失败：{str(e)}")
         return None
     except Exception as e:
@@ -227,7 +518,10 @@ def call_deepseek_api(user_inputs, user_name):
 
 # `convert_plotly_to_bytes` 函数已移除，因为它不再需要
 
-# 封装显示画像结果的逻辑，方便复用
+# 封装显示画像结果的逻辑，方便复用。
+# 声明为fragment：结果区内部的交互只重跑这个函数，
+# 不会带着整个脚本（表单、侧边栏等）一起rerun。
+@st.fragment
 def display_portrait_results(current_user_name, analysis_result_data):
     """
     显示AI潜力画像结果，包括雷达图、分析文本、下载提示和底部的微信推广。
@@ -245,26 +539,21 @@ def display_portrait_results(current_user_name, analysis_result_data):
     </div>
     """, unsafe_allow_html=True)
     
-    col1, col2 = st.columns([0.6, 0.4]) # 分列布局，雷达图占60%，分数占40%
-    
-    with col1:
-        scores = analysis_result_data.get('scores', {})
-        # 确保所有分数都是整数，避免类型错误
-        for k in ['innovation', 'collaboration', 'leadership', 'tech_acumen']:
-            try:
-                scores[k] = int(scores.get(k, 0))
-            except (ValueError, TypeError):
-                scores[k] = 0 # 转换失败则设为0
-        
-        fig = create_radar_chart(scores, current_user_name)
-        st.plotly_chart(fig, use_container_width=True) # 使用容器宽度，自适应布局
-    
-    with col2:
-        st.markdown("### 📊 详细得分")
-        st.metric("🧠 创新指数", f"{scores.get('innovation', 'N/A')}/100")
-        st.metric("🤝 协作潜力", f"{scores.get('collaboration', 'N/A')}/100")  
-        st.metric("👑 领导特质", f"{scores.get('leadership', 'N/A')}/100")
-        st.metric("⚡ 技术敏感度", f"{scores.get('tech_acumen', 'N/A')}/100")
+    scores = analysis_result_data.get('scores', {})
+    # 确保所有分数都是整数，避免类型错误：一次字典推导完成全部维度的转换
+    scores = {k: coerce_score(scores.get(k, 0)) for k in FORM_DIMENSIONS}
+
+    fig = create_radar_chart(scores, current_user_name)
+    # 使用容器宽度自适应布局；config开启客户端PNG导出按钮。
+    # theme=None 跳过Streamlit在每次渲染时把自家主题合并进figure的开销，
+    # 图表样式完全由我们的布局骨架决定。
+    st.plotly_chart(fig, use_container_width=True, theme=None, config=PLOTLY_CONFIG)
+
+    st.markdown("### 📊 详细得分")
+    # 四个维度的得分在一行 st.columns(4) 中并排渲染，展示文案预先格式化好
+    metric_cols = st.columns(4)
+    for col, (label, key) in zip(metric_cols, SCORE_LABELS):
+        col.metric(label, f"{scores[key]}/100")
             
     # 获取分析文本
     analysis_text = analysis_result_data.get('analysis', '分析内容生成失败，请重试。')
@@ -277,8 +566,8 @@ def display_portrait_results(current_user_name, analysis_result_data):
             
     st.markdown("### 📥 保存与分享")
             
-    # 图片下载功能已移除，替换为开发中提示
-    st.info("💡 图片下载功能正在开发中，敬请期待！您可以手动截图保存此画像。")
+    # 图片导出在浏览器端完成：提示用户使用雷达图工具栏的相机按钮下载PNG
+    st.info("💡 将鼠标悬停在雷达图上，点击右上角的 📷 相机按钮即可下载高清PNG图片，欢迎分享！")
     
     # 推广区域：继续你的AI学习之旅 (放置在主内容区域底部)
     st.markdown("---")
@@ -287,46 +576,68 @@ def display_portrait_results(current_user_name, analysis_result_data):
     col_promo1, col_promo2 = st.columns([1, 1])
             
     with col_promo1:
-        st.markdown("""
-        <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                    padding: 20px; border-radius: 10px; color: white; text-align: center;'>
-            <h4>🎓 想深入学习AI？</h4>
-            <p>获取更多WAIC独家资源<br>
-            职业发展机会等你来！</p>
-        </div>
-        """, unsafe_allow_html=True)
-            
+        st.markdown(PROMO_LEARN_HTML, unsafe_allow_html=True)
+
     with col_promo2:
-        # 在这里放置微信二维码，直接加载图片文件
-        # 请确保 qr_code.png 文件存在于应用根目录
-        try:
-            st.image("qr_code.png", width=180, caption="扫码加微信，获取更多资源")
-        except Exception: # 捕获无法找到图片文件的情况
-            st.markdown("""
-            <div style='border: 2px dashed #667eea; padding: 20px; 
-                        border-radius: 10px; text-align: center; height: 180px;
-                        display: flex; align-items: center; justify-content: center;'>
-                <div>
-                    <p>📱 微信二维码</p>
-                    <small>请将二维码图片保存为 qr_code.png</small>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-    st.markdown("""
-    <div style='text-align: center; font-size: 12px; color: #666; margin-top: 10px;'>
-        扫描你名片上的微信二维码，<br>
-        或联系我获取更多信息！
-    </div>
-    """, unsafe_allow_html=True)
+        # 在这里放置微信二维码，图片字节已在模块级缓存，避免重复读盘
+        qr_bytes = load_qr_code()
+        if qr_bytes:
+            st.image(qr_bytes, width=180, caption="扫码加微信，获取更多资源")
+        else: # 图片文件不存在时显示占位提示
+            st.markdown(QR_PLACEHOLDER_HTML, unsafe_allow_html=True)
+
+    st.markdown(WECHAT_CONTACT_FOOTER_HTML, unsafe_allow_html=True)
 
-    # 重新分析按钮
+    # 重新分析按钮。本函数是fragment，按钮点击默认只重跑结果区；
+    # 重新分析需要回到表单，因此清理状态后显式触发一次应用级rerun。
     if st.button("🔄 重新分析", use_container_width=True):
-        st.query_params.clear() # 清除URL参数，如果存在 (Streamlit 1.10.0+支持)
-        st.experimental_rerun() # 强制应用重新运行 (Streamlit 1.10.0+支持)
+        st.session_state.pop('last_analysis', None) # 移除已保存的画像，回到表单页
+        st.session_state.form_inputs = {key: "" for key in FORM_DIMENSIONS}
+        st.query_params.clear() # 清除URL参数，如果存在
+        st.rerun(scope="app")
+
+# 侧边栏信息。封装成函数并由 main() 调用，
+# 而不是在模块顶层执行，保持所有渲染逻辑都从 main() 出发。
+def render_sidebar():
+    with st.sidebar:
+        st.markdown("### 🎪 WAIC 2025") # 更新年份
+        st.markdown("**世界人工智能大会现场专享**")
+        st.markdown("---")
+        st.markdown("### 📋 使用说明")
+        st.markdown("""
+        1. 输入你的昵称
+        2. 详细回答四个维度的问题
+        3. 等待AI分析（约30秒）
+        4. 获得专属潜力雷达图
+        5. 点击雷达图相机按钮可下载图片
+        """)
+        st.markdown("---")
+        st.markdown("### 💡 小贴士")
+        st.markdown("""
+        - 回答越详细，分析越准确
+        - 可以结合具体案例和数据
+        - 真实回答比完美回答更有价值
+        """)
+        st.markdown("---")
+        st.markdown("### 💫 拓展你的 AI 视野")
+        st.markdown(SIDEBAR_PROMO_HTML, unsafe_allow_html=True)
+
+        # 这里放置二维码图片，复用缓存的图片字节
+        # 请将微信二维码图片保存为 qr_code.png 并放在同目录下
+        qr_bytes = load_qr_code()
+        if qr_bytes:
+            st.image(qr_bytes, width=200, caption="扫码获取更多AI资源")
+        else: # 图片文件不存在时显示占位提示
+            st.markdown(QR_PLACEHOLDER_HTML, unsafe_allow_html=True)
+
+        st.markdown(WECHAT_CONTACT_FOOTER_HTML, unsafe_allow_html=True)
+
 
 # 主应用界面
 def main():
+    # 侧边栏
+    render_sidebar()
+
     # 主标题
     st.markdown('<h1 class="main-title">🤖 WAIC 现场专享：免费 AI 潜力画像生成</h1>', 
                 unsafe_allow_html=True)
@@ -337,173 +648,99 @@ def main():
     通过AI深度分析，生成你的专属潜力雷达图。只需几分钟，获得专业的职业发展洞察！
     """)
     
-    # 强制初始化所有 session_state 变量在脚本的顶层，无论执行路径如何
-    # 这是解决 KeyError 的关键
+    # 强制初始化 session_state 变量在脚本的顶层，无论执行路径如何
+    # 这是解决 KeyError 的关键。四个维度的输入统一保存在一个字典里，
+    # 避免维护四个平行的 stored_xxx 变量。
     if 'stored_user_name' not in st.session_state:
         st.session_state.stored_user_name = ""
-    if 'stored_innovation_input' not in st.session_state:
-        st.session_state.stored_innovation_input = ""
-    if 'stored_collaboration_input' not in st.session_state:
-        st.session_state.stored_collaboration_input = ""
-    if 'stored_leadership_input' not in st.session_state:
-        st.session_state.stored_leadership_input = ""
-    if 'stored_tech_acumen_input' not in st.session_state:
-        st.session_state.stored_tech_acumen_input = ""
-
-    # 用户昵称输入框，直接从 session_state 获取和更新值
-    user_name_input_widget = st.text_input(
-        "👤 请输入你的昵称", 
-        placeholder="例如：小王、Alex、技术达人...", 
-        key="user_name_widget", # 确保 widget key 唯一
-        value=st.session_state.stored_user_name # 初始化值从session_state获取
+    if 'form_inputs' not in st.session_state:
+        st.session_state.form_inputs = {key: "" for key in FORM_DIMENSIONS}
+
+    # 已有分析结果时直接展示画像并结束本次rerun：
+    # 昵称输入、表单等整棵组件树都不再构建，结果也能在后续rerun中持续可见
+    last_analysis = st.session_state.get('last_analysis')
+    if last_analysis:
+        display_portrait_results(last_analysis['user_name'], last_analysis['result'])
+        st.stop()
+
+    # 用户昵称输入框。key直接指向 session_state 条目，
+    # Streamlit 会自动双向同步，无需再手动把返回值写回 session_state。
+    st.text_input(
+        "👤 请输入你的昵称",
+        placeholder="例如：小王、Alex、技术达人...",
+        key="stored_user_name"
     )
-    # 立即将 widget 的最新值同步到 session_state，以确保后续逻辑使用最新值
-    st.session_state.stored_user_name = user_name_input_widget
-    
-    # 只有当昵称输入框有内容时才显示下面的表单
-    if st.session_state.stored_user_name: 
-        st.markdown(f"### 👋 Hi {st.session_state.stored_user_name}，请回答以下四个问题：")
-        
-        # 创建表单
-        with st.form("profile_form", clear_on_submit=False): # clear_on_submit=False 以便在验证失败时保留输入
-            st.markdown("#### 📝 请详细回答以下问题，这将帮助AI更准确地分析你的潜力：")
-            
-            # 四个维度的问题，直接从session_state初始化值
-            innovation_input = st.text_area(
-                "🧠 **创新指数**：请描述一个你近期主导或参与的最有创意的项目或想法，你是如何贡献原创思路的？",
-                height=120,
-                placeholder="请详细描述你的创新经历...",
-                key="innovation_widget_form",
-                value=st.session_state.stored_innovation_input # 初始化值
-            )
-            
-            collaboration_input = st.text_area(
-                "🤝 **协作潜力**：请描述一次重要的团队合作经历。你的角色是什么？你如何促进沟通和团队效率？",
-                height=120,
-                placeholder="请分享你的团队协作经验...",
-                key="collaboration_widget_form",
-                value=st.session_state.stored_collaboration_input # 初始化值
-            )
-            
-            leadership_input = st.text_area(
-                "👑 **领导特质**：想象你领导的项目严重落后，你会采取哪三个关键步骤来扭转局面？",
-                height=120,
-                placeholder="请描述你的领导策略...",
-                key="leadership_widget_form",
-                value=st.session_state.stored_leadership_input # 初始化值
-            )
-            
-            tech_acumen_input = st.text_area(
-                "⚡ **技术敏感度**：哪一项新兴 AI 技术（如：多模态、AI Agent、生成式视频）最让你感到兴奋？为什么？你认为它会如何改变你所在的行业？",
+
+    # 本次rerun内昵称不会再变化，读取一次session_state后全程用局部变量
+    user_name = st.session_state.stored_user_name
+
+    # 昵称为空时直接短路返回：后面的表单和提交逻辑完全不用构建
+    if not user_name:
+        st.stop()
+
+    st.markdown(f"### 👋 Hi {user_name}，请回答以下四个问题：")
+
+    # 创建表单
+    with st.form("profile_form", clear_on_submit=False): # clear_on_submit=False 以便在验证失败时保留输入
+        st.markdown("#### 📝 请详细回答以下问题，这将帮助AI更准确地分析你的潜力：")
+
+        # 四个维度的问题由 FORM_QUESTIONS 配置驱动，循环生成，
+        # 避免四段几乎相同的 text_area 样板代码；初始值来自session_state
+        user_inputs = {}
+        for key in FORM_DIMENSIONS:
+            label, placeholder = FORM_QUESTIONS[key]
+            user_inputs[key] = st.text_area(
+                label,
                 height=120,
-                placeholder="请分享你对AI技术的见解...",
-                key="tech_acumen_widget_form",
-                value=st.session_state.stored_tech_acumen_input # 初始化值
+                placeholder=placeholder,
+                key=f"{key}_widget_form",
+                value=st.session_state.form_inputs[key] # 初始化值
             )
-            
-            # 提交按钮
-            submitted = st.form_submit_button("🚀 开始生成我的 AI 画像", use_container_width=True)
-        
-        # 处理表单提交
-        if submitted:
-            # 获取当前提交的值
-            current_user_name_value = st.session_state.stored_user_name # 昵称从session_state获取
-            # 表单内的输入框的值，在提交后可以直接从它们的返回值中获取
-            current_innovation_value = innovation_input
-            current_collaboration_value = collaboration_input
-            current_leadership_value = leadership_input
-            current_tech_acumen_value = tech_acumen_input
-            
-            # 提交后，将表单的当前输入值保存到 session_state，以便在下次刷新时保留
-            st.session_state.stored_innovation_input = current_innovation_value
-            st.session_state.stored_collaboration_input = current_collaboration_value
-            st.session_state.stored_leadership_input = current_leadership_value
-            st.session_state.stored_tech_acumen_input = current_tech_acumen_value
-
-
-            # 验证所有输入是否都已填写
-            if not all([current_innovation_value.strip(), current_collaboration_value.strip(), 
-                            current_leadership_value.strip(), current_tech_acumen_value.strip()]):
-                st.warning("⚠️ 请完整回答所有四个问题，这样AI才能给出更准确的分析哦！")
-            else: 
-                user_inputs = {
-                    'innovation': current_innovation_value,
-                    'collaboration': current_collaboration_value,
-                    'leadership': current_leadership_value,
-                    'tech_acumen': current_tech_acumen_value
-                }
-                
-                # 显示加载状态，并调用DeepSeek API
-                with st.spinner("✨ AI 大模型(DeepSeek)正在为你深度分析，请稍候..."):
-                    analysis_result = call_deepseek_api(user_inputs, current_user_name_value)
-                
-                if analysis_result:
-                    # 显示结果
-                    display_portrait_results(current_user_name_value, analysis_result)
-                    
-                    # 提交成功并显示结果后，清空除昵称外的所有输入框的session_state值
-                    # 这样下次显示表单时，除了昵称，其他输入框会是空的
-                    # 这里的清空操作是针对 stored_input 变量，因为它们是初始化表单的值来源
-                    st.session_state.stored_innovation_input = ""
-                    st.session_state.stored_collaboration_input = ""
-                    st.session_state.stored_leadership_input = ""
-                    st.session_state.stored_tech_acumen_input = ""
-                else:
-                    st.error("😅 分析出了一点小问题，请你调整一下输入内容再试试。确保每个问题都有详细的回答哦！")
-
-# 侧边栏信息
-with st.sidebar:
-    st.markdown("### 🎪 WAIC 2025") # 更新年份
-    st.markdown("**世界人工智能大会现场专享**")
-    st.markdown("---")
-    st.markdown("### 📋 使用说明")
-    st.markdown("""
-    1. 输入你的昵称
-    2. 详细回答四个维度的问题
-    3. 等待AI分析（约30秒）
-    4. 获得专属潜力雷达图
-    5. （图片下载功能正在开发中）
-    """) # 更新说明，移除下载图片，加上提示
-    st.markdown("---")
-    st.markdown("### 💡 小贴士")
-    st.markdown("""
-    - 回答越详细，分析越准确
-    - 可以结合具体案例和数据
-    - 真实回答比完美回答更有价值
-    """)
-    st.markdown("---")
-    st.markdown("### 💫 拓展你的 AI 视野")
-    st.markdown("""
-    <div style='text-align: center; padding: 10px; background-color: #f0f8ff; border-radius: 8px;'>
-        <p style='font-size: 14px; margin-bottom: 10px;'>
-        如果你想深入了解 AI 培训、<br>
-        职业发展机会或参与我们的<br>
-        社群，欢迎扫描下方二维码<br>
-        或添加我的微信，获取更多<br>
-        WAIC 独家资源！
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # 这里放置二维码图片
-    # 请将微信二维码图片保存为 qr_code.png 并放在同目录下
-    try:
-        # 注意：这里需要你实际提供一个名为 'qr_code.png' 的图片文件
-        st.image("qr_code.png", width=200, caption="扫码获取更多AI资源")
-    except Exception: # 捕获更通用的异常
-        st.markdown("""
-        <div style='text-align: center; padding: 20px; border: 2px dashed #ccc; border-radius: 8px;'>
-            <p>📱 微信二维码</p>
-            <small>请将二维码图片保存为 qr_code.png</small>
-        </div>
-        """, unsafe_allow_html=True)
-            
-    st.markdown("""
-    <div style='text-align: center; font-size: 12px; color: #666; margin-top: 10px;'>
-        扫描你名片上的微信二维码，<br>
-        或联系我获取更多信息！
-    </div>
-    """, unsafe_allow_html=True)
+
+        # 提交按钮
+        submitted = st.form_submit_button("🚀 开始生成我的 AI 画像", use_container_width=True)
+
+    # 未提交时本次rerun到此为止
+    if not submitted:
+        st.stop()
+
+    # 提交后，将表单的当前输入值保存到 session_state，以便在下次刷新时保留
+    st.session_state.form_inputs = dict(user_inputs)
+
+    # 验证所有输入是否都已填写（在进入API调用之前短路返回，不浪费请求）
+    if not user_name.strip():
+        st.warning("⚠️ 昵称不能为空白，请先填写昵称哦！")
+        st.stop()
+    if not all(value.strip() for value in user_inputs.values()):
+        st.warning("⚠️ 请完整回答所有四个问题，这样AI才能给出更准确的分析哦！")
+        st.stop()
+
+    # 先查会话级缓存：完全相同的输入直接复用上次的分析结果
+    cache = st.session_state.setdefault('analysis_cache', {})
+    cache_key = analysis_cache_key(user_inputs, user_name)
+    if cache_key in cache:
+        analysis_result = cache[cache_key]
+    else:
+        # 显示加载状态，并调用DeepSeek API
+        with st.spinner("✨ AI 大模型(DeepSeek)正在为你深度分析，请稍候..."):
+            analysis_result = call_deepseek_api(user_inputs, user_name)
+        if analysis_result:
+            cache[cache_key] = analysis_result
+
+    if not analysis_result:
+        st.error("😅 分析出了一点小问题，请你调整一下输入内容再试试。确保每个问题都有详细的回答哦！")
+        st.stop()
+
+    # 保存结果到会话状态：后续的rerun都会命中main()顶部的快捷路径，
+    # 直接展示画像而不再构建表单
+    st.session_state.last_analysis = {'user_name': user_name, 'result': analysis_result}
+
+    # 提交成功后清空除昵称外的所有输入框的session_state值
+    # 这样下次重新分析时，除了昵称，其他输入框会是空的
+    st.session_state.form_inputs = {key: "" for key in FORM_DIMENSIONS}
+
+    # 显示结果（每次提交只渲染这一处，不存在重复展示）
+    display_portrait_results(user_name, analysis_result)
 
 if __name__ == "__main__":
     main()